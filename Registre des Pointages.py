@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import io
 import plotly.graph_objects as go
 import plotly.express as px
@@ -10,6 +10,9 @@ import xlsxwriter
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 import os
+from validation import SCHEMA_POINTAGES, valider_donnees, afficher_rapport
+from stockage import (ingerer, charger_periode, source_disponible, version_source,
+                      annees_disponibles, sites_disponibles)
 
 
 # Fonction pour calculer la durée de travail
@@ -23,37 +26,31 @@ def calculer_duree_travail(entree, sortie):
     duree = (fin - debut)
     return duree
 
-# Fonction de chargement des données
+# Fonction de chargement des données (validées et converties avant tout calcul)
 @st.cache_data
 def charger_donnees(fichier):
-    return pd.read_excel(fichier)
+    return valider_donnees(pd.read_excel(fichier), SCHEMA_POINTAGES, source="des pointages")
 
-# Chargement des données
+# Lecture de l'historique partitionné : seules les partitions de la période sont lues.
+# La version de l'historique fait partie de la clé de cache pour suivre les synchronisations.
 @st.cache_data
-def load_data(uploaded_file):
-    if uploaded_file is not None:
-        try:
-            # Charger le fichier Excel ou CSV
-            df = pd.read_excel(uploaded_file) if uploaded_file.name.endswith('.xlsx') else pd.read_csv(uploaded_file)
-            
-            # Vérifier si la colonne "Date et heure" existe
-            if 'Date et heure' not in df.columns:
-                st.error("Le fichier ne contient pas de colonne 'Date et heure'.")
-                return None
-            
-            # Convertir la colonne "Date et heure" en type datetime
-            df['Date et heure'] = pd.to_datetime(df['Date et heure'], errors='coerce')
-            
-            # Vérifier les valeurs non converties (NaT)
-            if df['Date et heure'].isna().any():
-                st.warning("Certaines valeurs dans la colonne 'Date et heure' n'ont pas pu être converties.")
-            
-            return df
-        except Exception as e:
-            st.error(f"Erreur lors du chargement des données : {e}")
-            return None
-    else:
-        return None
+def charger_pointages(debut, fin, sites, version):
+    return charger_periode("pointages", debut, fin, 'Date et heure', sites=list(sites))
+
+# Ranger l'export dans l'historique partitionné par année/mois/site ; renvoie True si réussi
+def synchroniser_pointages(fichier):
+    # Vider le cache de l'export pour relire la version à jour du fichier
+    charger_donnees.clear()
+    try:
+        df_export, rapport = charger_donnees(fichier)
+    except Exception as e:
+        st.error(f"Erreur lors de la lecture du fichier Excel : {e}")
+        return False
+    afficher_rapport(rapport)
+    if df_export is None:
+        return False
+    ingerer(df_export, "pointages", SCHEMA_POINTAGES, 'Date et heure', colonne_site='Succursale')
+    return True
 
 def get_correct_and_incorrect_pointages(df):
     entrees = df[df['Action'] == 'Pointer entrée'].groupby('Prénom et nom').last()
@@ -127,9 +124,36 @@ st.title("Analyse des pointages")
 # Ajouter un widget pour télécharger le fichier Excel
 
 fichier_principal = "https://docs.google.com/spreadsheets/d/152ktjGubNDIr1PPG04mqJwZf9mhYTHmQ/export?format=xlsx"
-uploaded_file = pd.read_excel("https://docs.google.com/spreadsheets/d/152ktjGubNDIr1PPG04mqJwZf9mhYTHmQ/export?format=xlsx")
-df = charger_donnees(fichier_principal)
-df['Date et heure'] = pd.to_datetime(df['Date et heure'], errors='coerce')
+
+# Choix de la période dans l'historique
+st.sidebar.header("Période analysée")
+synchronisation_demandee = st.sidebar.button("Synchroniser l'historique")
+# La synchronisation automatique n'est tentée qu'une fois par session :
+# un échec ne relance pas le téléchargement à chaque interaction
+if synchronisation_demandee or (not source_disponible("pointages") and "sync_pointages" not in st.session_state):
+    st.session_state["sync_pointages"] = synchroniser_pointages(fichier_principal)
+
+annees = annees_disponibles("pointages")
+if not annees:
+    st.warning("Aucun pointage dans l'historique. Utilisez « Synchroniser l'historique » pour réessayer.")
+    st.stop()
+
+periode = st.sidebar.date_input("Période", value=(date(annees[-1], 1, 1), date(annees[-1], 12, 31)),
+                                min_value=date(annees[0], 1, 1), max_value=date(annees[-1], 12, 31))
+if len(periode) != 2:
+    st.stop()
+debut_periode, fin_periode = periode
+
+sites = sites_disponibles("pointages")
+sites_selectionnes = st.sidebar.multiselect("Sites", sites, default=sites) if len(sites) > 1 else sites
+if not sites_selectionnes:
+    st.info("Sélectionnez au moins un site.")
+    st.stop()
+
+df = charger_pointages(debut_periode, fin_periode, tuple(sites_selectionnes), version_source("pointages"))
+if df.empty:
+    st.info(f"Aucun pointage du {debut_periode} au {fin_periode}.")
+    st.stop()
 
 # Titre de l'application
 st.title("Répartition des Durées Totales par Employé")
@@ -182,14 +206,11 @@ if st.checkbox("Afficher les données brutes"):
 
 
 if fichier_principal is not None:
-    # Charger les données depuis le fichier téléchargé
-    df = charger_donnees(fichier_principal)
-    
     if df is not None:
         st.success("Données chargées avec succès !")
 
         # Créer les colonnes d'entrée/sortie
-        df_with_entry_exit = create_entry_exit_columns(df)
+        df_with_entry_exit = create_entry_exit_columns(df.copy())
 
         # Afficher les opérateurs avec leurs entrées/sorties
         result = get_entry_exit_times(df)
@@ -203,7 +224,7 @@ if fichier_principal is not None:
 else:
     st.info("Veuillez télécharger un fichier Excel ou CSV pour commencer l'analyse.")
         
-st.title("Analyse des pointages - Janvier 2025")
+st.title(f"Analyse des pointages - du {debut_periode} au {fin_periode}")
 
 operateurs_corrects, operateurs_incorrects = get_correct_and_incorrect_pointages(df)
 
@@ -220,16 +241,16 @@ with col2:
         for operateur in operateurs_incorrects:
             st.write(f"- {operateur}")
         
-# Filtrer les données pour janvier 2025
-df_janvier = df[df['Date et heure'].dt.month == 1]
+# Les données sont déjà limitées à la période sélectionnée
+df_periode = df.copy()
 
 col3, col4 = st.columns(2)
 
 with col3:
     # Nombre total de pointages par jour
     st.header("Nombre total de pointages par jour")
-    df_janvier['Date'] = pd.to_datetime(df_janvier['Date et heure']).dt.date
-    pointages_par_jour = df_janvier.groupby('Date').size()
+    df_periode['Date'] = pd.to_datetime(df_periode['Date et heure']).dt.date
+    pointages_par_jour = df_periode.groupby('Date').size()
     st.bar_chart(pointages_par_jour)
 
 with col4:
@@ -244,7 +265,7 @@ with col4:
 
     # Taux de succès
     st.header("Taux de succès")
-    taux_succes = (df_janvier['Statut'] == 'Succès').mean() * 100
+    taux_succes = (df_periode['Statut'] == 'Succès').mean() * 100
     # Données du taux de succès
     success_rate = taux_succes
     failure_rate = 100 - success_rate
@@ -269,8 +290,8 @@ with col4:
 # Observations particulières
 st.header("Observations particulières")
 observations = [
-    f"Nombre total d'enregistrements en janvier : {len(df_janvier)}",
-    f"Nombre d'opérateurs uniques : {df_janvier['Prénom et nom'].nunique()}",
+    f"Nombre total d'enregistrements sur la période : {len(df_periode)}",
+    f"Nombre d'opérateurs uniques : {df_periode['Prénom et nom'].nunique()}",
     f"Jour avec le plus de pointages : {pointages_par_jour.idxmax()} ({pointages_par_jour.max()} pointages)",
     f"Jour avec le moins de pointages : {pointages_par_jour.idxmin()} ({pointages_par_jour.min()} pointages)",
     "Certains opérateurs ont des pointages incomplets (entrée sans sortie ou vice versa)",
@@ -280,6 +301,6 @@ for obs in observations:
     st.write("- " + obs)
 
 # Affichage des données brutes
-if st.checkbox("Afficher les données brutes de janvier"):
-    st.subheader("Données brutes de janvier 2025")
-    st.write(df_janvier)
+if st.checkbox("Afficher les données brutes de la période"):
+    st.subheader(f"Données brutes du {debut_periode} au {fin_periode}")
+    st.write(df_periode)
@@ -2,47 +2,79 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import calendar
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import plotly.express as px
+from validation import SCHEMA_CONGES, valider_donnees, afficher_rapport
+from stockage import (ingerer, charger_periode, source_disponible, version_source,
+                      annees_disponibles, sites_disponibles)
 
 # Configuration de la page Streamlit
-st.set_page_config(page_title="Calendrier des Congés 2025", layout="wide")
-st.title("Calendrier des Congés 2025")
+st.set_page_config(page_title="Calendrier des Congés", layout="wide")
+st.title("Calendrier des Congés")
 
 # Fonction pour charger les données depuis le fichier Excel
 @st.cache_data
 def load_data(file_path):
+    df = pd.read_excel(file_path)
+
+    # Vérifier les colonnes par leur nom et convertir les dates en une seule passe
+    return valider_donnees(df, SCHEMA_CONGES, source="des congés")
+
+# Lecture de l'historique partitionné : seuls les mois qui recoupent la période sont lus
+@st.cache_data
+def charger_conges(debut, fin, sites, version):
+    return charger_periode("conges", debut, fin, 'Début', colonne_fin='Fin', sites=list(sites))
+
+# Ranger l'export dans l'historique partitionné (un congé est rangé dans chaque mois qu'il couvre) ;
+# renvoie True si réussi
+def synchroniser_conges(file_path):
+    # Vider le cache de l'export pour relire la version à jour du fichier
+    load_data.clear()
     try:
-        df = pd.read_excel(file_path)
+        df_export, rapport = load_data(file_path)
     except Exception as e:
         st.error(f"Erreur lors de la lecture du fichier Excel : {e}")
-        return None
-
-    # Vérifier et renommer les colonnes si nécessaire
-    expected_columns = ['Prénom et nom', 'Type', 'Type de congé', 'Début', 'Fin',
-                        'Succursale', 'Position', 'Ressources', 'Total (h)', 'Note',
-                        '# de la demande', 'Créée le', 'Approuvé à', 'Approbateur', 'Justification']
-    if not all(col in df.columns for col in expected_columns):
-        st.error("Les colonnes du fichier ne correspondent pas au format attendu.")
-        return None
-
-    return df
+        return False
+    afficher_rapport(rapport)
+    if df_export is None:
+        return False
+    ingerer(df_export, "conges", SCHEMA_CONGES, 'Début', colonne_fin='Fin', colonne_site='Succursale')
+    return True
 
 # URL du fichier Excel (Google Sheets exporté en .xlsx)
 file_path = "https://docs.google.com/spreadsheets/d/1IO_1-v5i0IZQSF6UUfYEuKlTn6i-3hSI/export?format=xlsx"
-df = load_data(file_path)
 
-# Vérifier si le DataFrame a été chargé correctement
-if df is None or df.empty:
-    st.warning("Aucune donnée à afficher.")
+st.sidebar.header("Période affichée")
+synchronisation_demandee = st.sidebar.button("Synchroniser l'historique")
+# La synchronisation automatique n'est tentée qu'une fois par session :
+# un échec ne relance pas le téléchargement à chaque interaction
+if synchronisation_demandee or (not source_disponible("conges") and "sync_conges" not in st.session_state):
+    st.session_state["sync_conges"] = synchroniser_conges(file_path)
+
+annees = annees_disponibles("conges")
+if not annees:
+    st.warning("Aucune donnée à afficher. Utilisez « Synchroniser l'historique » pour réessayer.")
     st.stop()
 
-# Convertir les colonnes 'Début' et 'Fin' en format datetime
-df['Début'] = pd.to_datetime(df['Début'], errors='coerce')
-df['Fin'] = pd.to_datetime(df['Fin'], errors='coerce')
+if len(annees) > 1:
+    annee_debut, annee_fin = st.sidebar.select_slider("Années", options=list(range(annees[0], annees[-1] + 1)),
+                                                      value=(annees[-1], annees[-1]))
+else:
+    annee_debut = annee_fin = annees[0]
+
+sites = sites_disponibles("conges")
+sites_selectionnes = st.sidebar.multiselect("Succursales", sites, default=sites) if len(sites) > 1 else sites
+if not sites_selectionnes:
+    st.info("Sélectionnez au moins une succursale.")
+    st.stop()
 
-# Filtrer les congés pour l'année 2025
-df = df[(df['Début'].dt.year == 2025) | (df['Fin'].dt.year == 2025)]
+df = charger_conges(date(annee_debut, 1, 1), date(annee_fin, 12, 31), tuple(sites_selectionnes),
+                    version_source("conges"))
+
+# Vérifier si des congés recoupent la période choisie
+if df.empty:
+    st.warning("Aucune donnée à afficher.")
+    st.stop()
 
 # Fonction pour créer un calendrier mensuel sous forme de grille
 def create_month_grid(year, month, data):
@@ -118,17 +150,20 @@ def create_month_grid(year, month, data):
     return fig
 
 # Affichage de l'interaction avec les mois et les années
+year_select = st.selectbox("Choisir une année", options=range(annee_debut, annee_fin + 1))
 month_select = st.selectbox("Choisir un mois", options=range(1, 13), format_func=lambda x: calendar.month_name[x])
 
 # Créer le calendrier interactif pour le mois sélectionné
-fig = create_month_grid(2025, month_select, df)
+fig = create_month_grid(year_select, month_select, df)
 
 # Afficher le calendrier dans Streamlit
 st.plotly_chart(fig)
 
 # Détails du congé sélectionné
 st.subheader("Détails des Congés")
-selected_date = st.date_input("Sélectionner une date", min_value=datetime(2025, 1, 1), max_value=datetime(2025, 12, 31))
+date_defaut = min(max(date.today(), date(annee_debut, 1, 1)), date(annee_fin, 12, 31))
+selected_date = st.date_input("Sélectionner une date", value=date_defaut,
+                              min_value=datetime(annee_debut, 1, 1), max_value=datetime(annee_fin, 12, 31))
 selected_day_conges = df[(df['Début'].dt.date <= selected_date) & (df['Fin'].dt.date >= selected_date)]
 
 if selected_day_conges.empty:
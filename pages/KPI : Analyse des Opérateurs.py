@@ -7,11 +7,12 @@ from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 import plotly.express as px
 import os
+from validation import SCHEMA_INTERVENTIONS, valider_donnees, afficher_rapport
 
-# Fonction de chargement des données
+# Fonction de chargement des données (colonnes résolues par nom, types convertis)
 @st.cache_data
 def charger_donnees(fichier):
-    return pd.read_excel(fichier)
+    return valider_donnees(pd.read_excel(fichier), SCHEMA_INTERVENTIONS, source="des interventions")
 
 team_1_Christian = ["Abdelaziz HANI DDAMIR", "Aboubacar TAMADOU", "Alhousseyni DIA", "Berkant INCE",
     "Boubakar Sidiki OUEDRAGO", "Boubou GASSAMA", "Chamsoudine ABDOULWAHAB", "Dagobert EWANE JENE",
@@ -95,17 +96,18 @@ st.set_page_config(page_title="Analyse des Interventions", page_icon="📊", lay
 st.title("📊 Analyse des interventions des opérateurs")
 
 fichier_principal = "https://docs.google.com/spreadsheets/d/1-iyR9W5tjVIn9SuvzuYGR-Ncf6aJLE1x/export?format=xlsx"
-df_principal = charger_donnees(fichier_principal)
+df_principal, rapport = charger_donnees(fichier_principal)
+afficher_rapport(rapport)
 
-if fichier_principal is not None:
+if df_principal is not None:
     
     df_principal['Team'] = df_principal['Prénom et nom'].apply(assign_team)
 
     col1, col2 = st.columns([2, 3])
 
     with col1:
-        col_prenom_nom = df_principal.columns[4]
-        col_date = df_principal.columns[6]
+        col_prenom_nom = 'Prénom et nom'
+        col_date = "Date et Heure début d'intervention"
 
         operateurs = df_principal[col_prenom_nom].unique().tolist()
         teams = df_principal['Team'].unique().tolist()     
@@ -130,7 +132,6 @@ if fichier_principal is not None:
         periodes = ["Jour", "Semaine", "Mois", "Trimestre", "Année"]
         periode_selectionnee = st.selectbox("Choisissez une période", periodes)
 
-        df_principal[col_date] = pd.to_datetime(df_principal[col_date], errors='coerce')
         date_min = df_principal[col_date].min()
         date_max = df_principal[col_date].max()
 
@@ -173,8 +174,7 @@ if fichier_principal is not None:
 
             # Calcul des moyennes par opérateur et par période
             moyennes_par_periode = repetitions_graph.groupby([periode_selectionnee, col_prenom_nom])['Repetitions'].mean().reset_index()
-            col_prenom_nom_exclus = df_principal[df_principal['Prénom et nom'].isin(team_exclus)].columns[4]
-            moyennes_par_periode_exclus = repetitions_graph.groupby([periode_selectionnee, col_prenom_nom_exclus])['Repetitions'].mean().reset_index()
+            moyennes_par_periode_exclus = repetitions_graph.groupby([periode_selectionnee, col_prenom_nom])['Repetitions'].mean().reset_index()
             moyennes_par_operateur = moyennes_par_periode.groupby(['Prénom et nom'])['Repetitions'].mean().reset_index()
             moyenne_globale = moyennes_par_operateur['Repetitions'].mean()           
             par_mois = df_principal.groupby(['Prénom et nom', 'Mois']).size().reset_index(name='Repetitions_Mois')
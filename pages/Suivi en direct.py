@@ -0,0 +1,92 @@
+import os
+import threading
+from datetime import timedelta
+
+import streamlit as st
+from suivi import SuiviPointages
+
+# Configuration de la page Streamlit
+st.set_page_config(page_title="Suivi en direct", page_icon="🟢", layout="wide")
+st.title("🟢 Opérateurs actuellement pointés")
+
+# Un seul suivi pour tout le processus : toutes les sessions voient le même état et un seul
+# serveur occupe le port des bornes ; il survit aux rafraîchissements et fermetures d'onglet
+@st.cache_resource
+def registre_suivi():
+    return {"verrou": threading.Lock(), "suivi": None, "source": None}
+
+def demarrer_suivi(mode, cible):
+    registre = registre_suivi()
+    source = (mode, cible)
+    with registre["verrou"]:
+        suivi = registre["suivi"]
+        if suivi is not None and registre["source"] == source and suivi.erreur is None:
+            return suivi
+        # Source changée (ou suivi en erreur) : l'ancien suivi est arrêté et son port libéré
+        if suivi is not None:
+            suivi.arreter()
+            registre["suivi"] = registre["source"] = None
+
+        suivi = SuiviPointages()
+        if mode == "Fichier":
+            suivi.suivre_fichier(cible)
+        else:
+            hote, port = cible
+            suivi.ecouter(hote, port)
+
+        # Un suivi qui n'a pas pu démarrer n'est pas conservé, pour pouvoir réessayer
+        if suivi.erreur is not None:
+            suivi.arreter()
+        else:
+            registre["suivi"], registre["source"] = suivi, source
+        return suivi
+
+# Choix de la source des événements ; par défaut, celle du suivi déjà en cours
+MODES = ["Fichier", "Bornes (socket)"]
+source_en_cours = registre_suivi()["source"]
+mode_defaut, cible_defaut = source_en_cours or ("Fichier", None)
+
+mode = st.sidebar.radio("Source des événements", MODES, index=MODES.index(mode_defaut))
+if mode == "Fichier":
+    chemin_defaut = cible_defaut if mode_defaut == "Fichier" else None
+    cible = st.sidebar.text_input("Fichier CSV ou JSONL suivi",
+                                  chemin_defaut or os.environ.get("POINTAGE_DEPOT", "pointages_en_direct.jsonl"))
+else:
+    hote_defaut, port_defaut = cible_defaut if mode_defaut != "Fichier" else ("127.0.0.1", 8765)
+    hote = st.sidebar.text_input("Hôte", hote_defaut)
+    port = int(st.sidebar.number_input("Port", min_value=1, max_value=65535, value=port_defaut, step=1))
+    cible = (hote, port)
+
+suivi = demarrer_suivi(mode, cible)
+if suivi.erreur is not None:
+    st.error(f"Impossible de démarrer le suivi en direct : {suivi.erreur}")
+    st.stop()
+
+# Seul ce fragment est réexécuté : le tableau se met à jour sans relancer toute la page
+@st.fragment(run_every=timedelta(milliseconds=500))
+def afficher_tableau():
+    if suivi.erreur is not None:
+        st.error(f"Erreur du suivi en direct : {suivi.erreur}")
+
+    etat = suivi.instantane()
+    presents = etat['presents']
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Opérateurs pointés", len(presents))
+    col2.metric("Événements reçus", etat['nb_evenements'])
+    col3.metric("Lignes rejetées", etat['nb_rejetes'])
+
+    if presents.empty:
+        st.info("Aucun opérateur n'est actuellement pointé.")
+    else:
+        st.dataframe(presents, use_container_width=True, hide_index=True)
+
+    col4, col5 = st.columns(2)
+    with col4:
+        with st.expander("Derniers événements"):
+            st.dataframe(etat['derniers_evenements'], use_container_width=True, hide_index=True)
+    with col5:
+        with st.expander("Derniers postes terminés"):
+            st.dataframe(etat['termines'], use_container_width=True, hide_index=True)
+
+afficher_tableau()
@@ -0,0 +1,189 @@
+import glob
+import os
+import shutil
+from datetime import datetime
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Dossier racine de l'historique partitionné (un sous-dossier par source)
+RACINE_STOCKAGE = os.environ.get(
+    "POINTAGE_STOCKAGE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees"))
+
+# Colonnes techniques ajoutées à l'ingestion et retirées à la lecture
+COLONNES_PARTITION = ["annee", "mois", "site"]
+COLONNE_LIGNE = "_ligne"
+FICHIER_VERSION = "_derniere_ingestion"
+
+
+def chemin_source(source):
+    return os.path.join(RACINE_STOCKAGE, source)
+
+
+# Indique si l'historique d'une source a déjà été ingéré
+def source_disponible(source):
+    return os.path.exists(os.path.join(chemin_source(source), FICHIER_VERSION))
+
+
+# Horodatage de la dernière ingestion, utilisé comme clé de cache par les pages
+def version_source(source):
+    chemin = os.path.join(chemin_source(source), FICHIER_VERSION)
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+# Années présentes dans l'historique, d'après les dossiers de partition
+def annees_disponibles(source):
+    chemin = chemin_source(source)
+    if not os.path.isdir(chemin):
+        return []
+    annees = []
+    for nom in os.listdir(chemin):
+        if nom.startswith("annee="):
+            try:
+                annees.append(int(nom.split("=", 1)[1]))
+            except ValueError:
+                continue
+    return sorted(annees)
+
+
+# Sites présents dans l'historique, d'après les dossiers de partition
+def sites_disponibles(source):
+    dossiers = glob.glob(os.path.join(chemin_source(source), "annee=*", "mois=*", "site=*"))
+    return sorted({unquote(os.path.basename(d).split("=", 1)[1]) for d in dossiers})
+
+
+# Ajouter les colonnes de partition ; une ligne couvrant plusieurs mois
+# (congé de fin décembre à début janvier) est rangée dans chacun de ses mois
+def _ajouter_partitions(df, colonne_date, colonne_fin=None, colonne_site=None):
+    df = df[df[colonne_date].notna()].reset_index(drop=True)
+
+    debut = df[colonne_date]
+    mois_debut = (debut.dt.year * 12 + debut.dt.month - 1).to_numpy()
+    if colonne_fin is not None:
+        # Empreinte stable de la ligne, pour dédoublonner à la lecture les lignes rangées dans plusieurs mois
+        df[COLONNE_LIGNE] = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        # Une ligne sans fin (congé d'un jour non renseigné) se termine le jour de son début,
+        # sinon le filtre de lecture sur la fin l'écarterait toujours
+        fin = df[colonne_fin] = df[colonne_fin].fillna(debut)
+        mois_fin = np.maximum((fin.dt.year * 12 + fin.dt.month - 1).to_numpy(), mois_debut)
+        nb_mois = mois_fin - mois_debut + 1
+        df = df.loc[df.index.repeat(nb_mois)].reset_index(drop=True)
+        decalage = np.arange(len(df)) - np.repeat(np.cumsum(nb_mois) - nb_mois, nb_mois)
+        mois_index = np.repeat(mois_debut, nb_mois) + decalage
+    else:
+        mois_index = mois_debut
+
+    df["annee"] = (mois_index // 12).astype("int32")
+    df["mois"] = (mois_index % 12 + 1).astype("int32")
+    if colonne_site is not None and colonne_site in df.columns:
+        df["site"] = df[colonne_site].astype("string").fillna("Non renseigné")
+    else:
+        df["site"] = "Tous"
+    return df
+
+
+# Fixer le type Parquet de chaque colonne d'après le schéma de validation, pour que
+# toutes les ingestions écrivent le même schéma (un PIN entier dans un export et texte
+# dans le suivant, ou une Note vide, rendraient sinon l'historique illisible)
+def _typer_colonnes(df, schema):
+    types = {colonne.nom: colonne.type for colonne in schema}
+    for col in df.columns:
+        if col in COLONNES_PARTITION or col == COLONNE_LIGNE:
+            continue
+        type_colonne = types.get(col)
+        if type_colonne is None and pd.api.types.is_datetime64_any_dtype(df[col]):
+            type_colonne = "datetime"
+        if type_colonne == "datetime":
+            df[col] = df[col].astype("datetime64[us]")
+        elif type_colonne == "numerique":
+            df[col] = df[col].astype("float64")
+        else:
+            df[col] = df[col].astype("string")
+    return df
+
+
+# Supprimer toutes les partitions (tous sites) des mois compris entre mois_min et mois_max
+def _vider_partitions(chemin, mois_min, mois_max):
+    for dossier in glob.glob(os.path.join(chemin, "annee=*", "mois=*")):
+        annee = int(os.path.basename(os.path.dirname(dossier)).split("=", 1)[1])
+        mois = int(os.path.basename(dossier).split("=", 1)[1])
+        if mois_min <= annee * 12 + mois - 1 <= mois_max:
+            shutil.rmtree(dossier)
+    # Une année sans mois ne doit plus apparaître dans annees_disponibles
+    for dossier in glob.glob(os.path.join(chemin, "annee=*")):
+        if not os.listdir(dossier):
+            os.rmdir(dossier)
+
+
+# Ranger un DataFrame validé dans l'historique partitionné par année/mois/site.
+# L'export fait foi sur toute sa période : chaque mois entre son premier et son dernier
+# mois est remplacé, y compris les partitions qui n'ont plus de lignes (congé annulé ou
+# déplacé). Les mois hors de cette période sont conservés tels quels.
+def ingerer(df, source, schema, colonne_date, colonne_fin=None, colonne_site=None):
+    df = _ajouter_partitions(df, colonne_date, colonne_fin, colonne_site)
+    df = _typer_colonnes(df, schema)
+
+    chemin = chemin_source(source)
+    os.makedirs(chemin, exist_ok=True)
+    if len(df):
+        mois_index = df["annee"].to_numpy() * 12 + df["mois"].to_numpy() - 1
+        _vider_partitions(chemin, mois_index.min(), mois_index.max())
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(table, chemin, partition_cols=COLONNES_PARTITION,
+                        existing_data_behavior="overwrite_or_ignore")
+
+    with open(os.path.join(chemin, FICHIER_VERSION), "w", encoding="utf-8") as f:
+        f.write(datetime.now().isoformat())
+    return len(df)
+
+
+# Filtres pyarrow : élagage des partitions année/mois hors période, puis
+# filtre des lignes poussé jusqu'aux row groups Parquet
+def _filtres_periode(debut, fin, colonne_date, colonne_fin=None, sites=None):
+    debut = pd.Timestamp(debut).normalize()
+    fin = pd.Timestamp(fin).normalize()
+    lendemain = fin + pd.Timedelta(days=1)
+
+    if colonne_fin is None:
+        filtres_lignes = [(colonne_date, ">=", debut), (colonne_date, "<", lendemain)]
+    else:
+        filtres_lignes = [(colonne_date, "<", lendemain), (colonne_fin, ">=", debut)]
+    if sites is not None:
+        filtres_lignes.append(("site", "in", list(sites)))
+
+    filtres = []
+    for annee in range(debut.year, fin.year + 1):
+        conjonction = [("annee", "=", annee)]
+        if annee == debut.year:
+            conjonction.append(("mois", ">=", debut.month))
+        if annee == fin.year:
+            conjonction.append(("mois", "<=", fin.month))
+        filtres.append(conjonction + filtres_lignes)
+    return filtres
+
+
+# Lire uniquement les partitions qui recoupent la période [debut, fin] (bornes incluses)
+def charger_periode(source, debut, fin, colonne_date, colonne_fin=None, sites=None):
+    chemin = chemin_source(source)
+    if not source_disponible(source) or pd.Timestamp(debut) > pd.Timestamp(fin):
+        return pd.DataFrame()
+    # Aucun site sélectionné : rien à lire (et non tous les sites)
+    if sites is not None and not list(sites):
+        return pd.DataFrame()
+
+    filtres = _filtres_periode(debut, fin, colonne_date, colonne_fin, sites)
+    table = pq.read_table(chemin, filters=filtres, partitioning="hive")
+    df = table.to_pandas()
+
+    # Une ligne rangée dans plusieurs mois ne doit apparaître qu'une fois
+    if colonne_fin is not None:
+        df = df.drop_duplicates(subset=COLONNE_LIGNE)
+    df = df.drop(columns=[c for c in COLONNES_PARTITION + [COLONNE_LIGNE] if c in df.columns])
+    return df.sort_values(colonne_date).reset_index(drop=True)
@@ -0,0 +1,228 @@
+import csv
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+import pandas as pd
+
+from validation import normaliser_nom
+
+ACTION_ENTREE = 'Pointer entrée'
+ACTION_SORTIE = 'Pointer sortie'
+# Même règle que get_entry_exit_times : une sortie plus d'un jour après l'entrée est ignorée
+DUREE_MAX_POSTE = timedelta(days=1)
+
+# Noms attendus des champs d'un événement, quelle que soit la casse ou l'accentuation
+CHAMPS = {normaliser_nom(nom): nom for nom in ['Prénom et nom', 'Action', 'Date et heure', 'PIN', 'Statut']}
+
+
+@dataclass
+class Poste:
+    nom: str
+    entree: pd.Timestamp
+    pin: object = None
+
+
+# État en mémoire des postes ouverts, alimenté événement par événement
+@dataclass
+class EtatPostes:
+    ouverts: dict = field(default_factory=dict)
+    termines: deque = field(default_factory=lambda: deque(maxlen=500))
+    derniers_evenements: deque = field(default_factory=lambda: deque(maxlen=50))
+    nb_evenements: int = 0
+    nb_rejetes: int = 0
+
+    # Appliquer un événement selon les règles d'appariement de get_entry_exit_times :
+    # une entrée ouvre un poste s'il n'y en a pas déjà un, une sortie ferme le poste
+    # ouvert si elle survient moins d'un jour après l'entrée, sinon le poste est abandonné
+    def appliquer(self, evenement):
+        nom = evenement['Prénom et nom']
+        moment = evenement['Date et heure']
+        poste = self.ouverts.get(nom)
+
+        if evenement['Action'] == ACTION_ENTREE:
+            # Écart volontaire avec get_entry_exit_times : un poste ouvert depuis plus d'un jour
+            # (sortie oubliée) ne pourra jamais être fermé, il est donc remplacé par la nouvelle
+            # entrée au lieu de la bloquer, sinon l'opérateur serait absent du tableau toute sa journée
+            if poste is None or moment - poste.entree > DUREE_MAX_POSTE:
+                self.ouverts[nom] = Poste(nom, moment, evenement.get('PIN'))
+        elif evenement['Action'] == ACTION_SORTIE and poste is not None:
+            # Calculer avant de modifier l'état, pour qu'un événement en erreur ne le laisse pas à moitié appliqué
+            ecart = moment - poste.entree
+            del self.ouverts[nom]
+            if ecart <= DUREE_MAX_POSTE:
+                self.termines.appendleft({'Prénom et nom': nom, 'Entrée': poste.entree, 'Sortie': moment,
+                                          'Durée (heures)': round(ecart.total_seconds() / 3600, 2)})
+        self.nb_evenements += 1
+        self.derniers_evenements.appendleft(evenement)
+
+    # Opérateurs actuellement pointés (les postes ouverts depuis plus d'un jour ne peuvent plus être fermés)
+    def presents(self, maintenant=None):
+        maintenant = pd.Timestamp.now() if maintenant is None else maintenant
+        lignes = [
+            {'Prénom et nom': p.nom, 'PIN': p.pin, 'Entrée': p.entree,
+             'Durée (heures)': round((maintenant - p.entree).total_seconds() / 3600, 2)}
+            for p in self.ouverts.values() if maintenant - p.entree <= DUREE_MAX_POSTE
+        ]
+        df = pd.DataFrame(lignes, columns=['Prénom et nom', 'PIN', 'Entrée', 'Durée (heures)'])
+        return df.sort_values('Entrée').reset_index(drop=True)
+
+
+# Convertir un enregistrement brut (ligne CSV ou JSON) en événement ; None si invalide
+def lire_evenement(brut):
+    evenement = {}
+    for cle, valeur in brut.items():
+        nom = CHAMPS.get(normaliser_nom(cle))
+        if nom is not None:
+            evenement[nom] = valeur
+    if not evenement.get('Prénom et nom') or evenement.get('Action') not in (ACTION_ENTREE, ACTION_SORTIE):
+        return None
+    try:
+        moment = pd.Timestamp(evenement['Date et heure'])
+        if pd.isna(moment):
+            return None
+        # Les horodatages avec fuseau sont ramenés à l'heure locale sans fuseau, comme l'export
+        if moment.tzinfo is not None:
+            moment = pd.Timestamp(moment.to_pydatetime().astimezone()).tz_localize(None)
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None
+    evenement['Date et heure'] = moment
+    return evenement
+
+
+def lire_ligne_json(ligne):
+    try:
+        brut = json.loads(ligne)
+    except ValueError:
+        return None
+    return lire_evenement(brut) if isinstance(brut, dict) else None
+
+
+# Suivre un fichier CSV ou JSONL alimenté en ajout seul, à la manière de `tail -f`.
+# Le fichier est relu depuis le début pour reconstituer les postes déjà ouverts,
+# puis seules les lignes ajoutées sont lues. Produit des lots (événements, nb de lignes rejetées).
+def suivre_fichier(chemin, arret, intervalle=0.1):
+    format_csv = chemin.lower().endswith('.csv')
+    entete = None
+    position = 0
+    reste = b''
+
+    while not arret.is_set():
+        taille = os.path.getsize(chemin) if os.path.exists(chemin) else 0
+        if taille < position:
+            # Fichier tronqué ou remplacé : on repart du début
+            position, reste, entete = 0, b'', None
+        if taille == position:
+            time.sleep(intervalle)
+            continue
+
+        with open(chemin, 'rb') as f:
+            f.seek(position)
+            bloc = f.read()
+            position = f.tell()
+
+        lignes = (reste + bloc).split(b'\n')
+        reste = lignes.pop()  # dernière ligne éventuellement incomplète
+        lignes = [ligne.decode('utf-8-sig', errors='replace').rstrip('\r') for ligne in lignes if ligne.strip()]
+
+        if format_csv:
+            if entete is None and lignes:
+                entete = next(csv.reader([lignes.pop(0)]))
+            evenements = [lire_evenement(dict(zip(entete, valeurs))) for valeurs in csv.reader(lignes)]
+        else:
+            evenements = [lire_ligne_json(ligne) for ligne in lignes]
+        valides = [e for e in evenements if e is not None]
+        yield valides, len(evenements) - len(valides)
+
+
+# Suivi en direct : un fil d'exécution applique les événements à l'état des postes
+class SuiviPointages:
+    def __init__(self):
+        self.etat = EtatPostes()
+        self.verrou = threading.Lock()
+        self.arret = threading.Event()
+        self.version = 0
+        self.erreur = None
+        self._fils = []
+
+    def _appliquer_lot(self, evenements, nb_rejetes=0):
+        with self.verrou:
+            for evenement in evenements:
+                # Un événement en erreur est compté comme rejeté sans interrompre le suivi
+                try:
+                    self.etat.appliquer(evenement)
+                except Exception:
+                    nb_rejetes += 1
+            self.etat.nb_rejetes += nb_rejetes
+            self.version += 1
+
+    def _lancer(self, cible, *args):
+        fil = threading.Thread(target=cible, args=args, daemon=True)
+        fil.start()
+        self._fils.append(fil)
+
+    # Suivre un dépôt local CSV/JSONL
+    def suivre_fichier(self, chemin, intervalle=0.1):
+        def boucle():
+            try:
+                for evenements, nb_rejetes in suivre_fichier(chemin, self.arret, intervalle):
+                    self._appliquer_lot(evenements, nb_rejetes)
+            except Exception as e:
+                self.erreur = e
+        self._lancer(boucle)
+
+    # Écouter les bornes de badgeage : une connexion TCP, un événement JSON par ligne
+    def ecouter(self, hote='127.0.0.1', port=8765):
+        suivi = self
+
+        class Gestionnaire(socketserver.StreamRequestHandler):
+            def handle(self):
+                # Lecture en octets et décodage ligne à ligne, comme suivre_fichier : un octet
+                # invalide rend la ligne illisible (rejetée) sans couper la connexion
+                for octets in self.rfile:
+                    if not octets.strip():
+                        continue
+                    evenement = lire_ligne_json(octets.decode('utf-8-sig', errors='replace'))
+                    suivi._appliquer_lot([evenement] if evenement else [], 0 if evenement else 1)
+
+        class Serveur(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        try:
+            serveur = Serveur((hote, port), Gestionnaire)
+        except OSError as e:
+            self.erreur = e
+            return
+
+        def surveiller_arret():
+            self.arret.wait()
+            serveur.shutdown()
+            serveur.server_close()  # libère le port
+        self._lancer(serveur.serve_forever, 0.1)
+        self._lancer(surveiller_arret)
+
+    # Arrêter le suivi et attendre ses fils, pour que le port soit libre au retour
+    def arreter(self, delai=2):
+        self.arret.set()
+        for fil in self._fils:
+            if fil is not threading.current_thread():
+                fil.join(delai)
+
+    # Copie cohérente de l'état pour l'affichage
+    def instantane(self, maintenant=None):
+        with self.verrou:
+            return {
+                'version': self.version,
+                'presents': self.etat.presents(maintenant),
+                'termines': pd.DataFrame(list(self.etat.termines),
+                                         columns=['Prénom et nom', 'Entrée', 'Sortie', 'Durée (heures)']),
+                'derniers_evenements': pd.DataFrame(list(self.etat.derniers_evenements)),
+                'nb_evenements': self.etat.nb_evenements,
+                'nb_rejetes': self.etat.nb_rejetes,
+            }
@@ -0,0 +1,160 @@
+import unicodedata
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+# Numéro de ligne du tableur de la première ligne de données (ligne 1 = en-tête)
+PREMIERE_LIGNE_DONNEES = 2
+
+
+# Description d'une colonne attendue dans un export
+@dataclass(frozen=True)
+class Colonne:
+    nom: str
+    type: str = "texte"  # "texte", "datetime" ou "numerique"
+    obligatoire: bool = True
+
+
+# Rapport produit par la validation (aucun affichage dans les fonctions en cache)
+@dataclass
+class RapportValidation:
+    source: str
+    colonnes_manquantes: list = field(default_factory=list)
+    colonnes_renommees: dict = field(default_factory=dict)
+    lignes_invalides: pd.DataFrame = field(
+        default_factory=lambda: pd.DataFrame(columns=["Ligne du fichier", "Colonne", "Valeur"]))
+
+    @property
+    def valide(self):
+        return not self.colonnes_manquantes
+
+    def invalides_par_colonne(self):
+        return self.lignes_invalides.groupby("Colonne").size()
+
+
+SCHEMA_POINTAGES = [
+    Colonne("Prénom et nom"),
+    Colonne("Action"),
+    Colonne("Date et heure", "datetime"),
+    Colonne("Statut"),
+    Colonne("PIN"),
+    Colonne("Succursale", obligatoire=False),
+]
+
+SCHEMA_CONGES = [
+    Colonne("Prénom et nom"),
+    Colonne("Type"),
+    Colonne("Type de congé"),
+    Colonne("Début", "datetime"),
+    Colonne("Fin", "datetime"),
+    Colonne("Succursale"),
+    Colonne("Position"),
+    Colonne("Ressources"),
+    Colonne("Total (h)", "numerique"),
+    Colonne("Note"),
+    Colonne("# de la demande"),
+    Colonne("Créée le", "datetime"),
+    Colonne("Approuvé à", "datetime"),
+    Colonne("Approbateur"),
+    Colonne("Justification"),
+]
+
+SCHEMA_INTERVENTIONS = [
+    Colonne("Prénom et nom"),
+    Colonne("Date et Heure début d'intervention", "datetime"),
+    Colonne("Équipement"),
+    Colonne("Localisation"),
+    Colonne("Technique"),
+    Colonne("Opérationnel"),
+    Colonne("Photo"),
+]
+
+
+# Normaliser un nom de colonne (casse, accents, espaces) pour le retrouver quel que soit l'export
+def normaliser_nom(nom):
+    nom = unicodedata.normalize("NFKD", str(nom))
+    nom = "".join(c for c in nom if not unicodedata.combining(c))
+    nom = nom.replace("’", "'")
+    return " ".join(nom.casefold().split())
+
+
+# Retrouver les colonnes du schéma par leur nom et les renommer avec le nom attendu
+def resoudre_colonnes(df, schema):
+    index_normalise = {}
+    for col in df.columns:
+        index_normalise.setdefault(normaliser_nom(col), col)
+
+    renommage = {}
+    manquantes = []
+    for colonne in schema:
+        trouvee = index_normalise.get(normaliser_nom(colonne.nom))
+        if trouvee is None:
+            if colonne.obligatoire:
+                manquantes.append(colonne.nom)
+        elif trouvee != colonne.nom:
+            renommage[trouvee] = colonne.nom
+    return renommage, manquantes
+
+
+# Convertir une colonne en une seule passe vectorisée
+def convertir_colonne(serie, type_colonne):
+    if type_colonne == "datetime":
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return serie
+        return pd.to_datetime(serie, errors="coerce")
+    if type_colonne == "numerique":
+        if pd.api.types.is_numeric_dtype(serie):
+            return serie
+        return pd.to_numeric(serie, errors="coerce")
+    return serie
+
+
+# Valider et convertir un DataFrame selon un schéma
+def valider_donnees(df, schema, source=""):
+    rapport = RapportValidation(source=source)
+    renommage, rapport.colonnes_manquantes = resoudre_colonnes(df, schema)
+    rapport.colonnes_renommees = renommage
+    if rapport.colonnes_manquantes:
+        return None, rapport
+
+    # Le DataFrame vient d'être lu par le chargeur : on le modifie sans copie
+    if renommage:
+        df.rename(columns=renommage, inplace=True)
+
+    invalides = []
+    for colonne in schema:
+        if colonne.nom not in df.columns or colonne.type == "texte":
+            continue
+        brute = df[colonne.nom]
+        convertie = convertir_colonne(brute, colonne.type)
+        if convertie is brute:
+            continue
+        # Valeurs présentes dans le fichier mais non convertibles
+        masque = convertie.isna().to_numpy() & brute.notna().to_numpy()
+        if masque.any():
+            invalides.append(pd.DataFrame({
+                "Ligne du fichier": np.flatnonzero(masque) + PREMIERE_LIGNE_DONNEES,
+                "Colonne": colonne.nom,
+                "Valeur": brute[masque].astype(str).to_numpy(),
+            }))
+        df[colonne.nom] = convertie
+
+    if invalides:
+        rapport.lignes_invalides = pd.concat(invalides, ignore_index=True)
+    return df, rapport
+
+
+# Afficher le rapport de validation dans la page (hors des fonctions en cache)
+def afficher_rapport(rapport):
+    if rapport.colonnes_manquantes:
+        st.error(f"Le fichier {rapport.source} ne contient pas les colonnes attendues : "
+                 f"{', '.join(rapport.colonnes_manquantes)}.")
+        return
+    if not rapport.lignes_invalides.empty:
+        details = ", ".join(f"{col} ({nb})" for col, nb in rapport.invalides_par_colonne().items())
+        st.warning(f"Certaines valeurs du fichier {rapport.source} n'ont pas pu être converties : {details}.")
+        with st.expander("Voir les lignes invalides"):
+            st.dataframe(rapport.lignes_invalides, use_container_width=True)